@@ -1,5 +1,8 @@
+import math
 import random
+import time
 from ortools.sat.python import cp_model
+from scheduling import configure_solver, attempt_time_limits, DEFAULT_DETERMINISTIC_WORKERS, MAX_RANDOM_SEED
 import pandas as pd
 from itertools import combinations
 
@@ -192,6 +195,34 @@ if not filename_prefix:
     filename_prefix = "weekly_schedule"
 output_filename = f"outputs/{filename_prefix}_weekly_schedule.xlsx"
 
+# Prompt for optional solver settings.
+num_workers_input = input(f"Enter the number of solver workers (or press Enter to use all cores, "
+                          f"{DEFAULT_DETERMINISTIC_WORKERS} in deterministic mode): ").strip()
+num_workers = None
+if num_workers_input:
+    if num_workers_input.isdigit() and int(num_workers_input) > 0:
+        num_workers = int(num_workers_input)
+    else:
+        print("Invalid number of workers, using the default.")
+seed_input = input("Enter a random seed for the solver (or press Enter for none): ").strip()
+random_seed = None
+if seed_input:
+    if seed_input.isdigit() and int(seed_input) <= MAX_RANDOM_SEED:
+        random_seed = int(seed_input)
+    else:
+        print(f"Invalid seed (allowed values 0 to {MAX_RANDOM_SEED}), solving without one.")
+deterministic = input("Run the solver in deterministic mode? (y/n): ").strip().lower() in ('y', 'yes')
+time_limit_input = input("Enter a time limit in seconds for all solver attempts together (or press Enter for none): ").strip()
+time_limit = None
+if time_limit_input:
+    try:
+        time_limit = float(time_limit_input)
+    except ValueError:
+        pass
+    if time_limit is None or not (math.isfinite(time_limit) and time_limit > 0):
+        print("Invalid time limit, solving without one.")
+        time_limit = None
+
 # ---------------------------
 # Define problem parameters for scheduling.
 # ---------------------------
@@ -238,8 +269,13 @@ scale = 10  # To convert fractional hours to integers.
 margin_lower = 0.67
 margin_upper = 0.73
 attempt = 1
+deadline = time.monotonic() + time_limit if time_limit is not None else None
 
 while attempt <= 10:
+    attempt_limit, attempt_deterministic_limit = attempt_time_limits(time_limit, deadline, deterministic)
+    if attempt_limit is not None and attempt_limit <= 0:
+        print(f"Time limit of {time_limit}s reached before attempt {attempt}. Try again with a higher time limit.")
+        exit(1)
     print(f"\nAttempt {attempt}: Trying with target hour margins {margin_lower*100:.0f}% to {margin_upper*100:.0f}%")
     
     model = cp_model.CpModel()
@@ -277,7 +313,9 @@ while attempt <= 10:
     
     model.Maximize(sum(shift_vars.values()))
     
-    solver = cp_model.CpSolver()
+    solver = configure_solver(cp_model.CpSolver(), num_workers=num_workers, random_seed=random_seed,
+                              deterministic=deterministic, time_limit=attempt_limit,
+                              deterministic_time_limit=attempt_deterministic_limit)
     status = solver.Solve(model)
     
     if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
@@ -289,7 +327,11 @@ while attempt <= 10:
         margin_upper += 0.01
         attempt += 1
 
-    print("No feasible solution found after 10 attempts. Exiting the scheduling loop now, try again with a different team configuration.")
+if attempt > 10:
+    if status == cp_model.UNKNOWN:
+        print(f"Time limit of {time_limit}s reached before a solution was found. Try again with a higher time limit.")
+    else:
+        print("No feasible solution found after 10 attempts. Exiting the scheduling loop now, try again with a different team configuration.")
     # You could raise an exception or exit gracefully.
     exit(1)
 
@@ -1,19 +1,140 @@
 # app.py
 import os
+import re
+import select
+import socket
 import tempfile
-from flask import Flask, render_template, request, send_file, flash, redirect, url_for
-from scheduling import run_scheduling, BASE_HOURS
+import threading
+import time
+import uuid
+from flask import Flask, render_template, request, send_file, flash, redirect, url_for, jsonify, abort
+from werkzeug.utils import secure_filename
+from scheduling import BASE_HOURS, DEFAULT_DETERMINISTIC_WORKERS, MAX_RANDOM_SEED
+from jobs import SchedulingJob, JobMetrics, COMPLETED, INFEASIBLE, CANCELLED, TIMED_OUT, FAILED
 app = Flask(__name__)
 app.secret_key = 'my_super_secret_key_123456'  # Replace with a secure random string!
 
+# Total number of solver workers shared by all concurrent requests. The budget is
+# kept in memory, so the server must run as a single process (see Procfile).
+SOLVER_CORE_BUDGET = int(os.environ.get('SOLVER_CORE_BUDGET', os.cpu_count() or 1))
+# Workers a request gets when none are entered in the form; a fair share of the
+# budget so that a single default request does not block all others.
+SOLVER_DEFAULT_WORKERS = min(int(os.environ.get('SOLVER_DEFAULT_WORKERS', max(1, SOLVER_CORE_BUDGET // 4))),
+                             SOLVER_CORE_BUDGET)
+# Seconds a request waits for free cores before giving up.
+SOLVER_QUEUE_TIMEOUT = float(os.environ.get('SOLVER_QUEUE_TIMEOUT', 60))
+# Upper bound for the per-request time limit entered in the form.
+MAX_TIME_LIMIT = float(os.environ.get('SOLVER_MAX_TIME_LIMIT', 600))
+# Largest team accepted from the form.
+MAX_EMPLOYEES = int(os.environ.get('MAX_EMPLOYEES', 50))
+# Address space limit of a solver subprocess in MB (0 disables the limit).
+JOB_MEMORY_LIMIT_MB = int(os.environ.get('JOB_MEMORY_LIMIT_MB', 2048))
+# Seconds a solver subprocess may run on top of the time limit, for model building and
+# writing the workbook. The CPU limit is time_limit * num_workers plus this overhead.
+JOB_CPU_OVERHEAD = int(os.environ.get('JOB_CPU_OVERHEAD', 60))
+
+class CoreBudget:
+    """
+    Counts the solver workers in use across concurrent requests.
+    A request reserves its workers before solving and releases them afterwards,
+    so the sum of num_workers of all running solves never exceeds the budget.
+    """
+    def __init__(self, total):
+        self.total = total
+        self.available = total
+        self._cond = threading.Condition()
+
+    def acquire(self, cores, timeout=None, should_stop=None, poll_interval=0.5):
+        """
+        Blocks until `cores` workers are free. Returns False on timeout or as soon as
+        should_stop() returns True; should_stop is checked every poll_interval seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while self.available < cores:
+                if should_stop is not None and should_stop():
+                    return False
+                wait = poll_interval if should_stop is not None else None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+            self.available -= cores
+            return True
+
+    def release(self, cores):
+        with self._cond:
+            self.available += cores
+            self._cond.notify_all()
+
+core_budget = CoreBudget(SOLVER_CORE_BUDGET)
+job_metrics = JobMetrics()
+# Running jobs of this process by job id, so that /cancel can reach them.
+active_jobs = {}
+active_jobs_lock = threading.Lock()
+# Job ids are generated by the page so that it can cancel the running request.
+JOB_ID_PATTERN = re.compile(r'[A-Za-z0-9]{8,64}')
+
+def client_disconnected(environ):
+    """
+    Returns True if the client of the current request has closed its connection.
+    Works with the gunicorn and werkzeug servers, which expose the client socket in the WSGI environ.
+    """
+    sock = environ.get('gunicorn.socket') or environ.get('werkzeug.socket')
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        # A readable socket without pending data has been closed by the client.
+        return bool(readable) and sock.recv(1, socket.MSG_PEEK) == b''
+    except (OSError, ValueError):
+        return True
+
+def parse_solver_options(form):
+    """
+    Reads the solver settings from the submitted form.
+    Returns a dict of keyword arguments for run_scheduling; raises ValueError on invalid input.
+    """
+    deterministic = form.get('deterministic') == 'on'
+    num_workers = form.get('num_workers', '').strip()
+    if num_workers:
+        num_workers = int(num_workers)
+    elif deterministic:
+        num_workers = min(DEFAULT_DETERMINISTIC_WORKERS, SOLVER_DEFAULT_WORKERS)
+    else:
+        num_workers = SOLVER_DEFAULT_WORKERS
+    if not 1 <= num_workers <= SOLVER_CORE_BUDGET:
+        raise ValueError(f"Anzahl Worker muss zwischen 1 und {SOLVER_CORE_BUDGET} liegen.")
+    random_seed = form.get('random_seed', '').strip()
+    random_seed = int(random_seed) if random_seed else None
+    if random_seed is not None and not 0 <= random_seed <= MAX_RANDOM_SEED:
+        raise ValueError(f"Seed muss zwischen 0 und {MAX_RANDOM_SEED} liegen.")
+    time_limit = form.get('time_limit', '').strip()
+    time_limit = float(time_limit) if time_limit else MAX_TIME_LIMIT
+    if not 0 < time_limit <= MAX_TIME_LIMIT:
+        raise ValueError(f"Zeitlimit muss zwischen 0 und {MAX_TIME_LIMIT:g} Sekunden liegen.")
+    return {
+        'num_workers': num_workers,
+        'random_seed': random_seed,
+        'deterministic': deterministic,
+        'time_limit': time_limit,
+    }
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
-        filename_prefix = request.form.get('filename_prefix') or "weekly_schedule"
-        output_filename = os.path.join(tempfile.gettempdir(), f"{filename_prefix}_weekly_schedule.xlsx")
+        filename_prefix = secure_filename(request.form.get('filename_prefix') or "") or "weekly_schedule"
+        download_name = f"{filename_prefix}_weekly_schedule.xlsx"
+        # Every job writes its own file so that concurrent requests never share a workbook.
+        output_filename = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4().hex}_{download_name}")
         
         # Always use manual (real) data.
         employees = request.form.getlist('employee_names[]')
+        if len(employees) > MAX_EMPLOYEES:
+            flash(f"Es können höchstens {MAX_EMPLOYEES} Mitarbeiter geplant werden.", "danger")
+            return redirect(url_for('index'))
         multipliers = request.form.getlist('multipliers[]')
         employee_target_hours = {}
         individual_unavailable = {}
@@ -34,13 +155,98 @@ def index():
             else:
                 individual_unavailable[name] = set()
         
-        result_file = run_scheduling(employees, employee_target_hours, individual_unavailable, never_available, output_filename)
-        if result_file:
-            return send_file(result_file, as_attachment=True)
+        try:
+            solver_options = parse_solver_options(request.form)
+        except ValueError as e:
+            flash(f"Ungültige Solver-Einstellungen: {e}", "danger")
+            return redirect(url_for('index'))
+
+        cores = solver_options['num_workers']
+        job_id = request.form.get('job_id', '')
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            job_id = uuid.uuid4().hex
+        job = SchedulingJob(
+            (employees, employee_target_hours, individual_unavailable, never_available),
+            dict(output_filename=output_filename,
+                 max_memory_mb=JOB_MEMORY_LIMIT_MB * 3 // 4 or None,
+                 **solver_options),
+            memory_limit_mb=JOB_MEMORY_LIMIT_MB,
+            cpu_limit=solver_options['time_limit'] * cores + JOB_CPU_OVERHEAD,
+            wall_limit=solver_options['time_limit'] + JOB_CPU_OVERHEAD)
+        with active_jobs_lock:
+            if job_id in active_jobs:
+                flash("Diese Planung läuft bereits.", "danger")
+                return redirect(url_for('index'))
+            active_jobs[job_id] = job
+        environ = request.environ
+
+        def stop_waiting():
+            if client_disconnected(environ):
+                job.cancel()
+            return job.cancelled
+
+        try:
+            # The job is registered first so that it can be cancelled while waiting for cores.
+            if not core_budget.acquire(cores, timeout=SOLVER_QUEUE_TIMEOUT, should_stop=stop_waiting):
+                if not job.cancelled:
+                    flash("Der Server ist ausgelastet. Bitte versuchen Sie es später erneut.", "danger")
+                    return redirect(url_for('index'))
+                # Cancelled while queued: count it like any other aborted job.
+                job_metrics.job_started()
+                job_metrics.job_finished(CANCELLED)
+                outcome, value = CANCELLED, None
+            else:
+                job_metrics.job_started()
+                outcome = None
+                try:
+                    outcome, value = job.run(should_cancel=lambda: client_disconnected(environ))
+                finally:
+                    core_budget.release(cores)
+                    job_metrics.job_finished(outcome or FAILED)
+        finally:
+            with active_jobs_lock:
+                active_jobs.pop(job_id, None)
+        if outcome == COMPLETED:
+            response = send_file(value, as_attachment=True, download_name=download_name)
+            # send_file has opened the workbook, so it can be unlinked now.
+            try:
+                os.remove(value)
+            except OSError:
+                pass
+            # The page polls for this cookie to hide its cancel button once the download arrives.
+            response.set_cookie('finished_job', job_id)
+            return response
+        elif outcome == CANCELLED:
+            flash("Die Planung wurde abgebrochen.", "warning")
+            return redirect(url_for('index'))
+        elif outcome == TIMED_OUT:
+            flash("Das Zeitlimit wurde erreicht, bevor ein Zeitplan gefunden wurde. "
+                  "Erhöhen Sie das Zeitlimit oder passen Sie die Teamkonfiguration an.", "warning")
+            return redirect(url_for('index'))
+        elif outcome != INFEASIBLE:
+            app.logger.error("Scheduling job %s failed: %s", job_id, value)
+            if job.limit_exceeded:
+                flash("Die Planung ist fehlgeschlagen (Speicher- oder CPU-Limit überschritten).", "danger")
+            else:
+                flash("Die Planung ist wegen eines internen Fehlers fehlgeschlagen.", "danger")
+            return redirect(url_for('index'))
         else:
             flash("No feasible solution found after 10 attempts. Please adjust your team configuration.", "danger")
             return redirect(url_for('index'))
     return render_template('index.html')
 
+@app.route('/cancel/<job_id>', methods=['POST'])
+def cancel(job_id):
+    with active_jobs_lock:
+        job = active_jobs.get(job_id)
+    if job is None:
+        abort(404)
+    job.cancel()
+    return '', 204
+
+@app.route('/metrics')
+def metrics():
+    return jsonify(job_metrics.snapshot())
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,162 @@
+# jobs.py
+import multiprocessing
+import os
+import threading
+import time
+
+try:
+    import resource  # Unix only; limits are skipped where it is unavailable.
+except ImportError:
+    resource = None
+
+from scheduling import run_scheduling, SchedulingCancelled, SchedulingTimedOut
+
+# Job outcomes, also used as metric names.
+COMPLETED = 'completed'
+INFEASIBLE = 'infeasible'
+CANCELLED = 'cancelled'
+TIMED_OUT = 'timed_out'
+FAILED = 'failed'
+
+# Value reported with FAILED when the job ran out of memory.
+MEMORY_LIMIT_EXCEEDED = 'memory limit exceeded'
+
+# Seconds the solver gets to return after StopSearch before the process is killed.
+STOP_GRACE_PERIOD = 5
+
+class JobMetrics:
+    """Thread-safe counters for started, running and finished scheduling jobs."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {'started': 0, 'running': 0, COMPLETED: 0, INFEASIBLE: 0, CANCELLED: 0,
+                        TIMED_OUT: 0, FAILED: 0}
+
+    def job_started(self):
+        with self._lock:
+            self._counts['started'] += 1
+            self._counts['running'] += 1
+
+    def job_finished(self, outcome):
+        with self._lock:
+            self._counts['running'] -= 1
+            self._counts[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+def _apply_limits(memory_limit_mb, cpu_limit):
+    """Sets the address space (MB) and CPU time (seconds) limits of the current process."""
+    if resource is None:
+        return
+    if memory_limit_mb:
+        limit = int(memory_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if cpu_limit:
+        # The soft limit sends SIGXCPU, the hard limit SIGKILL.
+        resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_limit), int(cpu_limit) + 5))
+
+def _job_main(conn, cancel_event, memory_limit_mb, cpu_limit, args, kwargs):
+    """Entry point of the job subprocess: applies the limits, solves and reports the outcome."""
+    _apply_limits(memory_limit_mb, cpu_limit)
+    try:
+        result_file = run_scheduling(*args, cancel_event=cancel_event, **kwargs)
+        conn.send((COMPLETED if result_file else INFEASIBLE, result_file))
+    except SchedulingCancelled:
+        conn.send((CANCELLED, None))
+    except SchedulingTimedOut:
+        conn.send((TIMED_OUT, None))
+    except MemoryError as e:
+        print(f"Scheduling job ran out of memory: {e!r}")
+        conn.send((FAILED, MEMORY_LIMIT_EXCEEDED))
+    except Exception as e:
+        conn.send((FAILED, repr(e)))
+    finally:
+        conn.close()
+
+class SchedulingJob:
+    """
+    Runs run_scheduling in a separate process with memory, CPU and wall-clock limits.
+    args and kwargs are passed to run_scheduling; output_filename must be given as keyword.
+    cancel() may be called from any thread; the solver is stopped via StopSearch
+    and the process is killed if it does not exit within STOP_GRACE_PERIOD.
+    A job still running after wall_limit seconds is stopped the same way and reported as TIMED_OUT.
+    After run(), limit_exceeded tells whether a FAILED job hit its memory or CPU limit.
+    """
+    def __init__(self, args, kwargs, memory_limit_mb=None, cpu_limit=None, wall_limit=None):
+        self.args = args
+        self.kwargs = kwargs
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit = cpu_limit
+        self.wall_limit = wall_limit
+        self.timed_out = False
+        self.limit_exceeded = False
+        self._cancel_event = multiprocessing.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def run(self, should_cancel=None, poll_interval=0.5):
+        """
+        Starts the subprocess and waits for it to finish.
+        should_cancel is polled every poll_interval seconds (e.g. to detect client disconnects).
+        Returns (outcome, value): value is the output filename for COMPLETED
+        and an error description for FAILED.
+        """
+        parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=_job_main,
+            args=(child_conn, self._cancel_event, self.memory_limit_mb, self.cpu_limit, self.args, self.kwargs),
+            daemon=True)
+        process.start()
+        child_conn.close()
+        wall_deadline = time.monotonic() + self.wall_limit if self.wall_limit is not None else None
+        stop_deadline = None
+        try:
+            while not parent_conn.poll(poll_interval):
+                if not process.is_alive():
+                    break
+                if stop_deadline is None and wall_deadline is not None and time.monotonic() > wall_deadline:
+                    self.timed_out = True
+                if stop_deadline is None and (self.timed_out or self.cancelled
+                                              or (should_cancel and should_cancel())):
+                    self.cancel()
+                    stop_deadline = time.monotonic() + STOP_GRACE_PERIOD
+                if stop_deadline is not None and time.monotonic() > stop_deadline:
+                    process.kill()
+                    break
+            try:
+                outcome, value = parent_conn.recv() if parent_conn.poll() else (None, None)
+            except EOFError:
+                outcome, value = None, None
+            if outcome is None:
+                # The process died without reporting, e.g. killed by a limit or after cancel().
+                process.join(STOP_GRACE_PERIOD)
+                if self.timed_out:
+                    outcome = TIMED_OUT
+                elif self.cancelled:
+                    outcome = CANCELLED
+                else:
+                    # A negative exit code means the process was killed by a signal,
+                    # e.g. SIGXCPU/SIGKILL from the CPU limit or the kernel OOM killer.
+                    self.limit_exceeded = process.exitcode is not None and process.exitcode < 0
+                    outcome, value = FAILED, f"solver process exited with code {process.exitcode}"
+        finally:
+            parent_conn.close()
+            process.join(STOP_GRACE_PERIOD)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        if self.timed_out and outcome == CANCELLED:
+            outcome = TIMED_OUT
+        if outcome == FAILED and value == MEMORY_LIMIT_EXCEEDED:
+            self.limit_exceeded = True
+        # Aborted jobs may have left a partially written workbook behind.
+        output_filename = self.kwargs.get('output_filename')
+        if outcome in (CANCELLED, TIMED_OUT, FAILED) and output_filename and os.path.exists(output_filename):
+            os.remove(output_filename)
+        return outcome, value
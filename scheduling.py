@@ -1,5 +1,7 @@
 # scheduling.py
 import random
+import threading
+import time
 from ortools.sat.python import cp_model
 import pandas as pd
 from itertools import combinations
@@ -7,6 +9,18 @@ from itertools import combinations
 # Constants and allowed values
 allowed_multipliers = [0.35, 0.40, 0.45, 0.50, 0.55, 0.60, 0.65, 0.70, 0.75, 0.80, 0.85, 0.90, 0.95, 1.0]
 BASE_HOURS = 420
+MAX_ATTEMPTS = 10
+# Worker count used when deterministic mode is requested without an explicit
+# num_workers; CP-SAT results only reproduce with a fixed worker count.
+DEFAULT_DETERMINISTIC_WORKERS = 8
+# CP-SAT stores the random seed as a 32-bit signed integer.
+MAX_RANDOM_SEED = 2**31 - 1
+
+class SchedulingCancelled(Exception):
+    """Raised by run_scheduling when its cancel_event is set before a solution is found."""
+
+class SchedulingTimedOut(Exception):
+    """Raised by run_scheduling when the time limit is reached before a solution is found."""
 
 def generate_sample_data(employees):
     """
@@ -47,11 +61,89 @@ def generate_sample_data(employees):
             never_available[e] = set()
     return employee_target_hours, individual_unavailable, never_available
 
-def run_scheduling(employees, employee_target_hours, individual_unavailable, never_available, output_filename):
+def configure_solver(solver, num_workers=None, random_seed=None, deterministic=False, time_limit=None,
+                     deterministic_time_limit=None, max_memory_mb=None):
+    """
+    Applies the solver settings to a CpSolver.
+      num_workers: number of search workers (None keeps the CP-SAT default of all cores)
+      random_seed: seed for the CP-SAT search (None keeps the CP-SAT default)
+      deterministic: pin the worker count and interleave the search so that
+                     repeated runs with the same seed return the same schedule
+      time_limit: wall-clock limit for this solve in seconds (None for no limit)
+      deterministic_time_limit: limit in CP-SAT deterministic time units, which roughly track
+                                seconds but do not depend on machine load (None for no limit)
+      max_memory_mb: memory limit after which CP-SAT stops the search (None for no limit)
+    """
+    if deterministic and num_workers is None:
+        num_workers = DEFAULT_DETERMINISTIC_WORKERS
+    if num_workers is not None:
+        solver.parameters.num_workers = num_workers
+    if random_seed is not None:
+        solver.parameters.random_seed = random_seed
+    if deterministic:
+        # Interleaved search makes the parallel portfolio reproducible.
+        solver.parameters.interleave_search = True
+    if time_limit is not None:
+        solver.parameters.max_time_in_seconds = time_limit
+    if deterministic_time_limit is not None:
+        solver.parameters.max_deterministic_time = deterministic_time_limit
+    if max_memory_mb is not None:
+        solver.parameters.max_memory_in_mb = max_memory_mb
+    return solver
+
+def attempt_time_limits(time_limit, deadline, deterministic):
+    """
+    Returns (time_limit, deterministic_time_limit) for the next solver attempt, for configure_solver.
+    The wall-clock limit is the time left until deadline (time.monotonic() based). In deterministic
+    mode each attempt also gets an equal share of time_limit as deterministic time, so results
+    reproduce as long as the wall-clock limit is not reached first.
+    Returns (None, None) if time_limit is None.
+    """
+    if time_limit is None:
+        return None, None
+    deterministic_time_limit = time_limit / MAX_ATTEMPTS if deterministic else None
+    return deadline - time.monotonic(), deterministic_time_limit
+
+def _time_limit_reached(solver, time_limit, deterministic_time_limit):
+    """
+    Returns True if the last Solve of solver used up its wall-clock or deterministic time limit,
+    as opposed to stopping for another reason such as its memory limit.
+    """
+    # CP-SAT checks its limits periodically, so allow for a small difference.
+    if time_limit is not None and solver.wall_time >= time_limit * 0.95:
+        return True
+    if (deterministic_time_limit is not None
+            and solver.response_proto.deterministic_time >= deterministic_time_limit * 0.95):
+        return True
+    return False
+
+def _watch_cancel(cancel_event, state):
+    """
+    Calls StopSearch on the running solver as soon as cancel_event is set.
+    state holds the current solver and a 'done' flag set by run_scheduling when it finishes.
+    """
+    while not cancel_event.wait(0.1):
+        if state['done']:
+            return
+    solver = state['solver']
+    if solver is not None:
+        solver.StopSearch()
+
+def run_scheduling(employees, employee_target_hours, individual_unavailable, never_available, output_filename,
+                   num_workers=None, random_seed=None, deterministic=False, time_limit=None,
+                   max_memory_mb=None, cancel_event=None):
     """
     Builds the scheduling model, solves it (trying up to 10 times while extending margins),
     then creates 10 weekly schedule tables plus an Analytics sheet.
     Writes the output to an Excel file and returns its filename.
+    Solver settings are passed to configure_solver. time_limit is the wall-clock budget in seconds
+    for all attempts together; in deterministic mode it also sets the deterministic time of each
+    attempt (see attempt_time_limits).
+    Returns None if every attempt is proven infeasible and raises SchedulingTimedOut if the
+    time limit ends the search before a solution is found. MemoryError is raised if CP-SAT
+    stops at max_memory_mb.
+    If cancel_event (a threading or multiprocessing Event) is set, the running solve is stopped
+    and SchedulingCancelled is raised instead of writing the workbook.
     """
     num_days = 70
     days = range(num_days)
@@ -87,8 +179,18 @@ def run_scheduling(employees, employee_target_hours, individual_unavailable, nev
     scale = 10  # Used to convert fractional hours to integers.
     margin_lower = 0.67
     margin_upper = 0.73
+    stop_state = {'solver': None, 'done': False}
+    if cancel_event is not None:
+        threading.Thread(target=_watch_cancel, args=(cancel_event, stop_state), daemon=True).start()
+
     attempt = 1
-    while attempt <= 10:
+    status = None
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+    while attempt <= MAX_ATTEMPTS:
+        attempt_limit, attempt_deterministic_limit = attempt_time_limits(time_limit, deadline, deterministic)
+        if attempt_limit is not None and attempt_limit <= 0:
+            status = cp_model.UNKNOWN
+            break
         print(f"Scheduling attempt {attempt}: Trying with target hour margins {margin_lower*100:.0f}% to {margin_upper*100:.0f}%")
         model = cp_model.CpModel()
         shift_vars = {}
@@ -122,8 +224,21 @@ def run_scheduling(employees, employee_target_hours, individual_unavailable, nev
                 model.Add(sum(shift_vars[(e, d, s)] for e in employees) == 1)
                 
         model.Maximize(sum(shift_vars.values()))
-        solver = cp_model.CpSolver()
+        solver = configure_solver(cp_model.CpSolver(), num_workers=num_workers, random_seed=random_seed,
+                                  deterministic=deterministic, time_limit=attempt_limit,
+                                  deterministic_time_limit=attempt_deterministic_limit,
+                                  max_memory_mb=max_memory_mb)
+        stop_state['solver'] = solver
+        if cancel_event is not None and cancel_event.is_set():
+            break
         status = solver.Solve(model)
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        if status == cp_model.UNKNOWN and not _time_limit_reached(solver, attempt_limit, attempt_deterministic_limit):
+            stop_state['done'] = True
+            if max_memory_mb is not None:
+                raise MemoryError(f"CP-SAT stopped at its memory limit of {max_memory_mb} MB")
+            raise RuntimeError(f"CP-SAT stopped without a result on attempt {attempt}")
         if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
             print(f"Solution found on attempt {attempt} with margins {margin_lower*100:.0f}% to {margin_upper*100:.0f}%.")
             break
@@ -132,7 +247,16 @@ def run_scheduling(employees, employee_target_hours, individual_unavailable, nev
             margin_upper += 0.01
             attempt += 1
 
-    if attempt > 10:
+    stop_state['done'] = True
+    if cancel_event is not None and cancel_event.is_set():
+        print(f"Scheduling cancelled during attempt {attempt}.")
+        raise SchedulingCancelled()
+    if status == cp_model.UNKNOWN:
+        # The search was stopped by a limit without proving the model infeasible.
+        print(f"Time limit of {time_limit}s reached during attempt {min(attempt, MAX_ATTEMPTS)}.")
+        raise SchedulingTimedOut()
+
+    if attempt > MAX_ATTEMPTS:
         print("No feasible solution found after 10 attempts. Exiting the scheduling loop.")
         print("Team and Availability Constraints:")
         for e in employees: